@@ -0,0 +1,9 @@
+"""
+Test package
+
+Defaults the test database to in-memory SQLite so the suite can run without
+a PostgreSQL server. Set DATABASE_URI to run against PostgreSQL instead.
+"""
+import os
+
+os.environ.setdefault("DATABASE_URI", "sqlite:///:memory:")
@@ -0,0 +1,113 @@
+"""
+Pytest configuration for the test suite
+
+When the suite runs under pytest-xdist each worker gets its own PostgreSQL
+schema so that parallel workers never share tables. This has to happen
+before the service package is imported because that import initializes
+the database.
+
+The fixtures set the app and database up once per session and run each
+route test inside a transaction that is rolled back afterwards.
+"""
+import os
+import logging
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
+
+
+def worker_database_uri(database_uri, worker):
+    """Returns a DATABASE_URI that isolates an xdist worker in its own schema"""
+    url = make_url(database_uri)
+    if not url.drivername.startswith("postgresql"):
+        # every worker process already has its own in-memory SQLite database
+        return database_uri
+    schema = f"test_{worker}"
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+    engine.dispose()
+    url = url.update_query_dict({"options": f"-csearch_path={schema}"})
+    return url.render_as_string(hide_password=False)
+
+
+WORKER = os.getenv("PYTEST_XDIST_WORKER")
+if WORKER:
+    os.environ["DATABASE_URI"] = worker_database_uri(os.environ["DATABASE_URI"], WORKER)
+
+
+# pylint: disable=wrong-import-position, redefined-outer-name
+from service import app  # noqa: E402
+from service.models import db, init_db  # noqa: E402
+
+DATABASE_URI = os.environ["DATABASE_URI"]
+
+
+######################################################################
+#  F I X T U R E S
+######################################################################
+@pytest.fixture(scope="session")
+def flask_app():
+    """Initializes the app and the database schema once per test session"""
+    app.config["TESTING"] = True
+    app.config["DEBUG"] = False
+    app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URI
+    app.config["SQLALCHEMY_ECHO"] = False
+    app.logger.setLevel(logging.CRITICAL)
+    # every test checks out exactly one connection, so keep just one open
+    if DATABASE_URI.startswith("sqlite"):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            "poolclass": StaticPool,
+            "connect_args": {"check_same_thread": False},
+        }
+    else:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            "poolclass": QueuePool,
+            "pool_size": 1,
+            "max_overflow": 0,
+        }
+    init_db(app)
+    db.create_all()
+    # test data is throwaway, so don't wait for commits to reach disk
+    if db.engine.dialect.name == "sqlite":
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA synchronous=OFF")
+            connection.exec_driver_sql("PRAGMA journal_mode=MEMORY")
+        # pysqlite defers BEGIN until the first DML statement, which
+        # would let a released SAVEPOINT commit the whole transaction
+        event.listen(db.engine, "begin", lambda conn: conn.exec_driver_sql("BEGIN"))
+    else:
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql("SET synchronous_commit TO OFF")
+    yield app
+    db.session.remove()
+    db.drop_all()
+
+
+@pytest.fixture(scope="session")
+def client(flask_app):
+    """Returns a test client shared by the whole session"""
+    return flask_app.test_client()
+
+
+@pytest.fixture
+def db_rollback(flask_app):  # pylint: disable=unused-argument
+    """Runs a test inside a transaction that is rolled back afterwards"""
+    original_session = db.session
+    connection = db.engine.connect()
+    trans = connection.begin()
+    db.session = scoped_session(sessionmaker(bind=connection))
+    nested = connection.begin_nested()
+
+    @event.listens_for(db.session, "after_transaction_end")
+    def restart_savepoint(session, transaction):  # pylint: disable=unused-argument
+        nonlocal nested
+        if not nested.is_active:
+            nested = connection.begin_nested()
+
+    yield
+    trans.rollback()
+    connection.close()
+    db.session = original_session